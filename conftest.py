@@ -0,0 +1,8 @@
+"""Pytest configuration shared by all the days"""
+
+import sys
+
+
+def pytest_collectstart():
+    """Forget the main module of the previous day, every day has its own"""
+    sys.modules.pop("main", None)
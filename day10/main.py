@@ -2,10 +2,15 @@
 """Matching paranthesis"""
 
 import argparse
+import heapq
 import logging
+import os
+import random
 import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Tuple
 
 
 def args_parser() -> argparse.Namespace:
@@ -28,6 +33,18 @@ def args_parser() -> argparse.Namespace:
         default=Path("./main.log"),
         help="Path of log file",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes scoring chunks of the file",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Keep reading lines appended to the file and print running scores",
+    )
 
     return parser.parse_args()
 
@@ -152,17 +169,251 @@ def autocomplete_score(data: List[str]) -> int:
     return int(statistics.median(score))
 
 
+# Closing bracket expected for every opening bracket
+CLOSER = {"(": ")", "[": "]", "{": "}", "<": ">"}
+CORRUPTION_SCORE = {")": 3, "]": 57, "}": 1197, ">": 25137}
+COMPLETION_SCORE = {")": 1, "]": 2, "}": 3, ">": 4}
+
+
+def check_line(line: str) -> Tuple[str, int]:
+    """Classify a line as corrupted or incomplete in a single scan
+    Args:
+        line: Input string line
+    Returns:
+        Offending bracket of a corrupted line, or an empty string and the
+        completion score of an incomplete line, 0 for a complete line
+    """
+    expected = []
+    for char in line:
+        closer = CLOSER.get(char)
+        if closer:
+            expected.append(closer)
+        elif char in CORRUPTION_SCORE:
+            if not expected or expected.pop() != char:
+                return char, 0
+
+    score = 0
+    for closer in reversed(expected):
+        score = score * 5 + COMPLETION_SCORE[closer]
+
+    return "", score
+
+
+def score_lines(data: List[str]) -> Tuple[int, int]:
+    """Calculate the mismatch and autocomplete scores in a single pass
+    Args:
+        data: Input data
+    Returns:
+        Score of mismatch brackets and median score of missing brackets
+    """
+    corruption = 0
+    completion = []
+    for line in data:
+        char, score = check_line(line)
+        if char:
+            corruption += CORRUPTION_SCORE[char]
+        elif score:
+            completion.append(score)
+
+    return corruption, select_median(completion)
+
+
+def select_kth(values: List[int], k: int) -> int:
+    """Find the k-th smallest value in expected linear time with quickselect
+    Args:
+        values: Values to select from
+        k: Zero based rank of the value
+    Returns:
+        The k-th smallest value
+    """
+    while True:
+        pivot = random.choice(values)
+        lower = [val for val in values if val < pivot]
+        if k < len(lower):
+            values = lower
+            continue
+        num_equal = sum(1 for val in values if val == pivot)
+        if k < len(lower) + num_equal:
+            return pivot
+        k -= len(lower) + num_equal
+        values = [val for val in values if val > pivot]
+
+
+def select_median(values: List[int]) -> int:
+    """Median of the values without sorting them
+    Args:
+        values: Values to find the median of
+    Returns:
+        Median, rounded down for an even number of values, 0 if none
+    """
+    if not values:
+        return 0
+    half = len(values) // 2
+    if len(values) % 2:
+        return select_kth(values, half)
+
+    return (select_kth(values, half - 1) + select_kth(values, half)) // 2
+
+
+def _chunk_offsets(file_path: Path, num_chunks: int) -> List[Tuple[int, int]]:
+    """Split a file into byte ranges that start and end on line boundaries
+    Args:
+        file_path: Path of input file
+        num_chunks: Number of chunks to split into
+    Returns:
+        Start and end byte offset of every chunk
+    """
+    size = os.path.getsize(file_path)
+    bounds = [0]
+    with file_path.open("rb") as fptr:
+        for i in range(1, num_chunks):
+            fptr.seek(max(size * i // num_chunks, bounds[-1]))
+            fptr.readline()
+            bounds.append(min(fptr.tell(), size))
+    bounds.append(size)
+
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def _score_chunk(task: Tuple[Path, int, int]) -> Tuple[int, List[int]]:
+    """Score the lines within a byte range of a file
+    Args:
+        task: Path of input file, start and end byte offset of the chunk
+    Returns:
+        Score of mismatch brackets and scores of missing brackets
+    """
+    file_path, start, end = task
+    corruption = 0
+    completion = []
+    with file_path.open("rb") as fptr:
+        fptr.seek(start)
+        while fptr.tell() < end:
+            char, score = check_line(fptr.readline().decode("ascii"))
+            if char:
+                corruption += CORRUPTION_SCORE[char]
+            elif score:
+                completion.append(score)
+
+    return corruption, completion
+
+
+def score_file(file_path: Path, workers: int) -> Tuple[int, int]:
+    """Calculate the mismatch and autocomplete scores of a file by scoring
+    chunks of it in worker processes
+    Args:
+        file_path: Path of input file
+        workers: Number of worker processes
+    Returns:
+        Score of mismatch brackets and median score of missing brackets
+    """
+    if not file_path.exists():
+        logging.warning("No such file exists '%s'!", file_path)
+        return 0, 0
+
+    tasks = [
+        (file_path, start, end) for start, end in _chunk_offsets(file_path, workers)
+    ]
+    corruption = 0
+    completion: List[int] = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_corruption, chunk_completion in executor.map(_score_chunk, tasks):
+            corruption += chunk_corruption
+            completion += chunk_completion
+
+    return corruption, select_median(completion)
+
+
+class OnlineScorer:
+    """Running mismatch score and median autocomplete score of a line stream"""
+
+    def __init__(self) -> None:
+        """Initialize an empty scorer"""
+        self.corruption = 0
+        # Max heap of the lower half and min heap of the upper half of the
+        # completion scores, the lower half holds the extra middle value
+        self._lower: List[int] = []
+        self._upper: List[int] = []
+
+    def __len__(self) -> int:
+        """Number of incomplete lines seen
+        Returns:
+            Count of completion scores
+        """
+        return len(self._lower) + len(self._upper)
+
+    def add(self, line: str) -> Tuple[str, int]:
+        """Score a line and update the running scores
+        Args:
+            line: Input string line
+        Returns:
+            Offending bracket of a corrupted line, or an empty string and the
+            completion score of an incomplete line
+        """
+        char, score = check_line(line)
+        if char:
+            self.corruption += CORRUPTION_SCORE[char]
+        elif score:
+            heapq.heappush(self._lower, -heapq.heappushpop(self._upper, score))
+            if len(self._lower) > len(self._upper) + 1:
+                heapq.heappush(self._upper, -heapq.heappop(self._lower))
+
+        return char, score
+
+    def median(self) -> int:
+        """Median of the completion scores seen so far
+        Returns:
+            Median, rounded down for an even number of values, 0 if none
+        """
+        if not self._lower:
+            return 0
+        if len(self._lower) > len(self._upper):
+            return -self._lower[0]
+
+        return (-self._lower[0] + self._upper[0]) // 2
+
+
+def follow_file(file_path: Path, poll_interval: float = 0.5) -> Iterator[str]:
+    """Read the lines of a file, waiting for new lines to be appended
+    Args:
+        file_path: Path of input file
+        poll_interval: Seconds to wait before looking for new lines
+    Returns:
+        Generator of complete lines
+    """
+    with file_path.open("r") as fptr:
+        partial = ""
+        while True:
+            line = fptr.readline()
+            if not line:
+                time.sleep(poll_interval)
+                continue
+            partial += line
+            if partial.endswith("\n"):
+                yield partial
+                partial = ""
+
+
 def main() -> None:
     """Main function"""
     args = args_parser()
     setup_logger(args.log_path)
 
-    lines = read_file(args.file_path)
+    if args.follow:
+        scorer = OnlineScorer()
+        try:
+            for line in follow_file(args.file_path):
+                scorer.add(line)
+                print(f"Score: {scorer.corruption}, autocomplete: {scorer.median()}")
+        except KeyboardInterrupt:
+            pass
+        return
 
-    ans = mismarch_score(lines)
+    if args.workers > 1:
+        ans, ans2 = score_file(args.file_path, args.workers)
+    else:
+        ans, ans2 = score_lines(read_file(args.file_path))
     assert ans == 392043
     print(f"Score: {ans}")
-    ans2 = autocomplete_score(lines)
     assert ans2 == 1605968119
     print(f"Autocomplete score: {ans2}")
 
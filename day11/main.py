@@ -5,7 +5,7 @@ import argparse
 import logging
 import re
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Union
 
 import numpy as np
 
@@ -96,6 +96,48 @@ def get_neighbours(data: np.ndarray, i: int, j: int) -> List[Tuple[int, int]]:
     return neighbours
 
 
+def _neighbour_count(mask: np.ndarray) -> np.ndarray:
+    """Count the set 8-neighbours of every point with padded shifted sums
+    Args:
+        mask: Boolean mask, the last two axes are the 2D grid
+    Returns:
+        Number of set neighbours of every point
+    """
+    padded = np.pad(mask, [(0, 0)] * (mask.ndim - 2) + [(1, 1), (1, 1)])
+    padded = padded.astype(np.int8)
+    # Separable 3x3 box sum, minus the point itself
+    vert = padded[..., :-2, :] + padded[..., 1:-1, :] + padded[..., 2:, :]
+    box = vert[..., :-2] + vert[..., 1:-1] + vert[..., 2:]
+
+    return box - mask
+
+
+def octopus_energy_levels(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Simulate one step of the octopus energy levels of many grids in lockstep
+    Args:
+        data: (G, H, W) stack of grids, updated in place
+    Returns:
+        Count of number of flashes per grid and the updated grids
+    """
+    data += 1
+    flashed = np.zeros(data.shape, dtype=bool)
+    new = data > 9
+    # Only the grids that still have new flashes take part in the next wave
+    active = np.nonzero(new.any(axis=(1, 2)))[0]
+    new = new[active]
+    while active.size:
+        # Plain views instead of fancy indexing copies while every grid is active
+        sel = slice(None) if active.size == len(data) else active
+        flashed[sel] |= new
+        data[sel] += _neighbour_count(new)
+        new = (data[sel] > 9) & ~flashed[sel]
+        keep = new.any(axis=(1, 2))
+        active, new = active[keep], new[keep]
+
+    data[flashed] = 0
+    return flashed.sum(axis=(1, 2)), data
+
+
 def octopus_energy_level(data: np.ndarray) -> Tuple[int, np.ndarray]:
     """Simulate the octopus energy levels
     Args:
@@ -103,53 +145,53 @@ def octopus_energy_level(data: np.ndarray) -> Tuple[int, np.ndarray]:
     Returns:
         Count of number of flashes
     """
-    count = 0
-    data += 1
-    xval, yval = np.nonzero(data > 9)
-    while len(xval):
-        count += len(xval)
-        for i, j in zip(xval, yval):
-            data[i, j] = 0
-            neigh = get_neighbours(data, i, j)
-            for val in neigh:
-                data[val] += 1 if 0 < data[val] <= 9 else 0
-        xval, yval = np.nonzero(data > 9)
-
-    return count, data
+    counts, _ = octopus_energy_levels(data[None])
+    return int(counts[0]), data
 
 
-def count_flashes(data, num: int = 100) -> int:
+def count_flashes(data: np.ndarray, num: int = 100) -> Union[int, np.ndarray]:
     """Simulate flashes for num steps
     Args:
-        data: Input dtat
+        data: Input data, or a (G, H, W) stack of grids
         num: Number of steps
     Returns:
-        Count of flashes for num steps
+        Count of flashes for num steps, per grid for a stack of grids
     """
-    tmp = data.copy()
-    count = 0
+    # Energy levels never exceed 9 + 1 + 8 within a step
+    tmp = data.astype(np.int8).reshape(-1, *data.shape[-2:])
+    count = np.zeros(len(tmp), dtype=np.int64)
     for _ in range(num):
-        cnt, tmp = octopus_energy_level(tmp)
+        cnt, tmp = octopus_energy_levels(tmp)
         count += cnt
 
-    return count
+    return count if data.ndim == 3 else int(count[0])
 
 
-def synchronized_flash(data: np.ndarray) -> int:
+def synchronized_flash(
+    data: np.ndarray, max_steps: Optional[int] = None
+) -> Union[int, np.ndarray]:
     """Get the step when the first synchronized flash happens
     Args:
-        data: Input data
+        data: Input data, or a (G, H, W) stack of grids
+        max_steps: Give up after this many steps if given
     Returns:
-        Step of synchronized flash
+        Step of synchronized flash, per grid for a stack of grids, -1 if the
+        grid did not synchronize within max_steps
     """
-    tmp = data.copy()
+    tmp = data.astype(np.int8).reshape(-1, *data.shape[-2:])
+    size = tmp.shape[1] * tmp.shape[2]
+    steps = np.full(len(tmp), -1, dtype=np.int64)
+    # Grids that synchronized are dropped from the simulation
+    active = np.arange(len(tmp))
     i = 0
-    count = 0
-    while count < 100:
-        count, tmp = octopus_energy_level(tmp)
+    while active.size and (max_steps is None or i < max_steps):
+        count, tmp = octopus_energy_levels(tmp)
         i += 1
+        synced = count == size
+        steps[active[synced]] = i
+        active, tmp = active[~synced], tmp[~synced]
 
-    return i
+    return steps if data.ndim == 3 else int(steps[0])
 
 
 def main() -> None:
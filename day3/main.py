@@ -4,7 +4,9 @@
 import argparse
 import logging
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Tuple
+
+import numpy as np
 
 
 def arg_parser() -> argparse.Namespace:
@@ -27,6 +29,19 @@ def arg_parser() -> argparse.Namespace:
         default=Path("./main.log"),
         help="Path of log file",
     )
+    parser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        help="Stream the input in chunks to compute the binary diagnostic",
+    )
+    parser.add_argument(
+        "-c",
+        "--chunk_size",
+        type=int,
+        default=65536,
+        help="Number of rows per chunk in streaming mode",
+    )
 
     return parser.parse_args()
 
@@ -68,6 +83,84 @@ def read_file(file_path: Path) -> List[str]:
     return lines
 
 
+def read_file_chunks(file_path: Path, chunk_size: int) -> Iterator[List[str]]:
+    """Read input file lazily in chunks of rows
+    Args:
+        file_path: Path of input file
+        chunk_size: Maximum number of rows per chunk
+    Returns:
+        Generator of chunks of rows
+    """
+    chunk = []
+    try:
+        with file_path.open("r") as fptr:
+            for line in fptr:
+                line = line.strip()
+                if not line:
+                    continue
+                chunk.append(line)
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+    except FileNotFoundError:
+        logging.warning("No such file '%s' exists!", file_path)
+
+    if chunk:
+        yield chunk
+
+
+def count_ones(chunks: Iterator[List[str]]) -> Tuple[np.ndarray, int]:
+    """Count the number of ones at every position of the binary strings
+    Args:
+        chunks: Chunks of binary strings, all of the same width
+    Returns:
+        Count of ones per position and the total number of strings
+    """
+    counts = np.zeros(0, dtype=np.int64)
+    total = 0
+    for chunk in chunks:
+        if not total:
+            counts = np.zeros(len(chunk[0]), dtype=np.int64)
+        bits = np.frombuffer("".join(chunk).encode("ascii"), dtype=np.uint8)
+        if bits.size != len(chunk) * counts.size:
+            raise ValueError("All binary strings should have the same width!")
+        bits = bits.reshape(len(chunk), counts.size) - ord("0")
+        counts += bits.sum(axis=0, dtype=np.int64)
+        total += len(chunk)
+
+    return counts, total
+
+
+def gamma_epsilon(counts: np.ndarray, total: int) -> Tuple[int, int]:
+    """Calculate gamma and epsilon values from the per position count of ones
+    Args:
+        counts: Count of ones per position
+        total: Total number of binary strings
+    Returns:
+        Gamma and epsilon values
+    """
+    gamma = int("".join("1" if 2 * cnt >= total else "0" for cnt in counts), 2)
+    epsilon = ((1 << len(counts)) - 1) ^ gamma
+    return gamma, epsilon
+
+
+def binary_diagnostic_stream(file_path: Path, chunk_size: int = 65536) -> int:
+    """Calculate the binary diagnostic without keeping the rows in memory
+    Args:
+        file_path: Path of input file
+        chunk_size: Number of rows to read at a time
+    Returns
+        Product of decimal values of Gamma and epsilon
+    """
+    counts, total = count_ones(read_file_chunks(file_path, chunk_size))
+    if not total:
+        logging.error("Data is empty!")
+        return -1
+
+    gamma, epsilon = gamma_epsilon(counts, total)
+    return gamma * epsilon
+
+
 def _is_max_one(data: List[str], pos: int) -> bool:
     """Check if the max value at position pos for all strings is 1
     Args:
@@ -158,6 +251,11 @@ def main() -> None:
     args = arg_parser()
     setup_logging(args.log_path)
 
+    if args.stream:
+        res = binary_diagnostic_stream(args.file_path, args.chunk_size)
+        print(f"Binary Diagnostic value: {res}")
+        return
+
     data = read_file(args.file_path)
 
     res1 = binary_diagnostic(data)
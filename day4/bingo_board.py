@@ -1,23 +1,80 @@
 """Bingo board"""
 
-from typing import List
+from typing import List, Optional
 
 import numpy as np
 
 
+class WinLines:
+    """Lines of cells of an NxN board that win once all of them are crossed out"""
+
+    __slots__ = ("size", "masks", "lengths", "cell_lines", "indices")
+
+    def __init__(
+        self,
+        size: int = 5,
+        rows: bool = True,
+        cols: bool = True,
+        diagonals: bool = False,
+        masks: Optional[np.ndarray] = None,
+    ) -> None:
+        """Initialize the winning lines of a board
+        Args:
+            size: Number of rows and columns of a board
+            rows: If complete rows win
+            cols: If complete columns win
+            diagonals: If the two complete diagonals win
+            masks: Additional (L, size, size) boolean masks of winning cells
+        """
+        eye = np.eye(size, dtype=bool)
+        row_masks = np.repeat(eye[:, :, None], size, axis=2)
+        line_masks = [np.zeros((0, size, size), dtype=bool)]
+        if rows:
+            line_masks.append(row_masks)
+        if cols:
+            line_masks.append(row_masks.transpose(0, 2, 1))
+        if diagonals:
+            line_masks.append(np.stack([eye, eye[::-1]]))
+        if masks is not None:
+            line_masks.append(np.asarray(masks, dtype=bool).reshape(-1, size, size))
+
+        self.size = size
+        self.masks = np.concatenate(line_masks)
+        assert self.masks.any(axis=(1, 2)).all(), "Every line needs a cell!"
+
+        flat = self.masks.reshape(len(self.masks), -1)
+        self.lengths = flat.sum(axis=1).tolist()
+        self.cell_lines = [np.nonzero(cell)[0].tolist() for cell in flat.T]
+
+        # Cell indices of each line, padded with the out of board index size**2
+        self.indices = np.full((len(flat), max(self.lengths)), size * size)
+        for i, line in enumerate(flat):
+            cells = np.nonzero(line)[0]
+            self.indices[i, : len(cells)] = cells
+
+
 class BingoBoard:
-    """5x5 Bingo Boards"""
+    """NxN Bingo Boards"""
+
+    __slots__ = ("board", "ticks", "lines", "line_hits", "unmarked")
 
-    def __init__(self, data: List[List[int]]) -> None:
+    def __init__(self, data: List[List[int]], lines: Optional[WinLines] = None) -> None:
         """Initialize a bingo board with data
         Args:
-            data: 5x5 data to initialize the board
+            data: NxN data to initialize the board
+            lines: Winning lines of the board, rows and columns by default
         """
-        assert len(data) == 5, "Num rows of bingo board should be 5!"
-        assert len(data[0]) == 5, "Num cols of bingo board should be 5!"
+        size = len(data)
+        assert all(len(row) == size for row in data), "Bingo board should be NxN!"
+        if lines is None:
+            lines = WinLines(size)
+        assert lines.size == size, "Winning lines don't match the board size!"
 
         self.board = np.array(data)
-        self.ticks = np.zeros((5, 5), dtype=bool)
+        self.ticks = np.zeros((size, size), dtype=bool)
+        self.lines = lines
+        self.line_hits = [0] * len(lines.lengths)
+        self.unmarked = int(self.board.sum())
 
     def __str__(self) -> str:
         """Print an object
@@ -26,29 +83,40 @@ class BingoBoard:
         """
         return self.board.__str__()
 
+    def mark(self, row: int, col: int) -> bool:
+        """Mark a single cell of the board in time proportional to its lines
+        Args:
+            row: Row of the cell
+            col: Column of the cell
+        Returns:
+            If any line through the cell is complete
+        """
+        cell_lines = self.lines.cell_lines[row * self.lines.size + col]
+        if not self.ticks[row, col]:
+            self.ticks[row, col] = True
+            for line in cell_lines:
+                self.line_hits[line] += 1
+            self.unmarked -= int(self.board[row, col])
+
+        return any(self.line_hits[i] == self.lines.lengths[i] for i in cell_lines)
+
     def cross_out(self, val: int) -> None:
         """Cross out a value from the board
         Args:
             val: Value to cross out if exists on board
         """
-        mask = self.board == val
-        if mask.any():
-            self.ticks[mask] = True
+        for row, col in zip(*np.nonzero(self.board == val)):
+            self.mark(row, col)
 
     def check(self) -> bool:
         """Check if bingo"""
-        row_sum = self.ticks.sum(axis=0)
-        if (row_sum == 5).any():
-            return True
-        col_sum = self.ticks.sum(axis=1)
-        if (col_sum == 5).any():
-            return True
-
-        return False
+        return any(
+            hits == length for hits, length in zip(self.line_hits, self.lines.lengths)
+        )
 
     def score(self) -> int:
         """Score of the board
         Returns:
             Sum of all the non ticked numbers on the board
         """
-        return self.board[~self.ticks].sum()
+        return self.unmarked
@@ -4,9 +4,12 @@
 import argparse
 import logging
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
-from bingo_board import BingoBoard
+import numpy as np
+
+from bingo_board import BingoBoard, WinLines
+from tournament import parse_tournament, tournament
 
 
 def arg_parser() -> argparse.Namespace:
@@ -67,10 +70,13 @@ def read_file(file_path: Path) -> List[str]:
     return lines
 
 
-def setup_game(data: List[str]) -> Tuple[List[int], List[BingoBoard]]:
+def setup_game(
+    data: List[str], lines: Optional[WinLines] = None
+) -> Tuple[List[int], List[BingoBoard]]:
     """Setup the boards and the bingo onput numbers
     Args:
         data: Input data to create a bingo game
+        lines: Winning lines of the boards, rows and columns by default
     Returns:
         Numers to call out and the list of boards
     """
@@ -81,30 +87,62 @@ def setup_game(data: List[str]) -> Tuple[List[int], List[BingoBoard]]:
         if line:
             tmp.append(list(map(int, line.split())))
         else:
-            boards.append(BingoBoard(tmp))
+            boards.append(BingoBoard(tmp, lines))
             tmp = []
 
     return numbers, boards
 
 
+def build_index(boards: List[BingoBoard]) -> Dict[int, List[Tuple[int, int, int]]]:
+    """Index every number to the cells of the boards that contain it
+    Args:
+        boards: List of boards
+    Returns:
+        Map from a number to its (board, row, column) positions
+    """
+    index: Dict[int, List[Tuple[int, int, int]]] = {}
+    for i, board in enumerate(boards):
+        for (row, col), val in np.ndenumerate(board.board):
+            index.setdefault(int(val), []).append((i, row, col))
+
+    return index
+
+
+def simulate(
+    numbers: List[int], boards: List[BingoBoard]
+) -> Iterator[Tuple[int, List[Tuple[int, int]]]]:
+    """Play a game of bingo one draw at a time
+    Args:
+        numbers: Numbers to call out
+        boards: List of boards
+    Returns:
+        Generator of each drawn number and the boards, with their scores, that
+        won on that draw
+    """
+    index = build_index(boards)
+    already_won = set()
+    for num in numbers:
+        wins = []
+        for i, row, col in index.get(num, []):
+            if boards[i].mark(row, col) and i not in already_won:
+                already_won.add(i)
+                wins.append((i, boards[i].score() * num))
+        yield num, wins
+
+
 def play(numbers: List[int], boards: List[BingoBoard]) -> List[Tuple[int, int]]:
     """Play a game of bingo and pick the boards that win in a list
     Args:
-        data: Input data to create a bingo game
+        numbers: Numbers to call out
+        boards: List of boards
     Returns:
         List of boards and their corresponding scores
     """
     wins = []
-    already_won = set()
     num_boards = len(boards)
-    for num in numbers:
-        for i, board in enumerate(boards):
-            board.cross_out(num)
-            if board.check() and i not in already_won:
-                already_won.add(i)
-                scr = board.score() * num
-                wins.append((i, scr))
-        if len(already_won) == num_boards:
+    for _, draw_wins in simulate(numbers, boards):
+        wins += draw_wins
+        if len(wins) == num_boards:
             break
 
     return wins
@@ -117,12 +155,12 @@ def main() -> None:
 
     data = read_file(args.file_path)
 
-    nums, boards = setup_game(data)
-    scores = play(nums, boards)
-    assert scores[0][1] == 28082
-    assert scores[-1][1] == 8224
-    print(f"SCore to win: {scores[0][1]}")
-    print(f"SCore to lose: {scores[-1][1]}")
+    nums, boards = parse_tournament(data)
+    _, scores = tournament(nums, boards)
+    assert scores[0] == 28082
+    assert scores[-1] == 8224
+    print(f"SCore to win: {scores[0]}")
+    print(f"SCore to lose: {scores[-1]}")
 
 
 if __name__ == "__main__":
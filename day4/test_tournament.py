@@ -0,0 +1,82 @@
+"""Tests for day 4"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+from bingo_board import BingoBoard, WinLines
+from main import play, simulate
+from tournament import parse_tournament, tournament
+
+
+def test_tournament():
+    """Test the vectorized tournament against playing board by board"""
+    path = os.path.dirname(os.path.realpath(__file__))
+    with Path(path + "/inputs.txt").open("r") as fptr:
+        data = [line.strip() for line in fptr]
+    numbers, stack = parse_tournament(data)
+    order, scores = tournament(numbers, stack)
+
+    boards = [BingoBoard(board.tolist()) for board in stack]
+    wins = []
+    for num in numbers:
+        for i, board in enumerate(boards):
+            board.cross_out(num)
+            if i not in wins and board.check():
+                wins.append(i)
+                assert scores[len(wins) - 1] == board.score() * num
+
+    assert order.tolist() == wins
+    assert scores[0] == 28082
+    assert scores[-1] == 8224
+
+
+def test_tournament_diagonals():
+    """Test the vectorized tournament on 7x7 boards with diagonal wins"""
+    rng = np.random.default_rng(0)
+    numbers = rng.permutation(100)[:60]
+    stack = np.stack([rng.permutation(100)[:49].reshape(7, 7) for _ in range(50)])
+    lines = WinLines(7, diagonals=True)
+    order, scores = tournament(numbers, stack, lines)
+
+    boards = [BingoBoard(board.tolist(), lines) for board in stack]
+    wins, expected = [], []
+    for num in numbers:
+        for i, board in enumerate(boards):
+            board.cross_out(num)
+            if i not in wins and board.check():
+                wins.append(i)
+                expected.append(board.score() * num)
+
+    assert order.tolist() == wins
+    assert scores.tolist() == expected
+
+
+def test_play():
+    """Test the per draw simulation against the vectorized tournament"""
+    path = os.path.dirname(os.path.realpath(__file__))
+    with Path(path + "/inputs.txt").open("r") as fptr:
+        data = [line.strip() for line in fptr]
+    numbers, stack = parse_tournament(data)
+    order, scores = tournament(numbers, stack)
+
+    wins = play(numbers.tolist(), [BingoBoard(board.tolist()) for board in stack])
+    assert [i for i, _ in wins] == order.tolist()
+    assert [score for _, score in wins] == scores.tolist()
+
+
+def test_simulate_diagonals():
+    """Test the per draw simulation on 7x7 boards with diagonal wins"""
+    rng = np.random.default_rng(0)
+    numbers = rng.permutation(100)[:60]
+    stack = np.stack([rng.permutation(100)[:49].reshape(7, 7) for _ in range(50)])
+    lines = WinLines(7, diagonals=True)
+    order, scores = tournament(numbers, stack, lines)
+
+    boards = [BingoBoard(board.tolist(), lines) for board in stack]
+    events = list(simulate(numbers.tolist(), boards))
+    assert [num for num, _ in events] == numbers.tolist()
+    wins = [win for _, draw_wins in events for win in draw_wins]
+    assert [i for i, _ in wins] == order.tolist()
+    assert [score for _, score in wins] == scores.tolist()
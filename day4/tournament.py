@@ -0,0 +1,83 @@
+"""Vectorized bingo tournament"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from bingo_board import WinLines
+
+
+def parse_tournament(data: List[str], size: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse the numbers to call out and all the boards into a single tensor
+    Args:
+        data: Input data to create a bingo game
+        size: Number of rows and columns of a board
+    Returns:
+        Numbers to call out and the (B, size, size) stack of boards
+    """
+    numbers = np.array(data[0].split(sep=","), dtype=np.int64)
+    cells = np.array(" ".join(data[1:]).split(), dtype=np.int64)
+    assert cells.size % (size * size) == 0, "Incomplete bingo board in input!"
+
+    return numbers, cells.reshape(-1, size, size)
+
+
+def draw_turns(numbers: np.ndarray, boards: np.ndarray) -> np.ndarray:
+    """Map every cell of every board to the turn its number is drawn
+    Args:
+        numbers: Numbers to call out in order
+        boards: (B, N, N) stack of boards
+    Returns:
+        (B, N, N) turns, len(numbers) for numbers that are never drawn
+    """
+    num_turns = len(numbers)
+    high = max(int(numbers.max(initial=0)), int(boards.max(initial=0))) + 1
+    lookup = np.full(high, num_turns, dtype=np.int32)
+    # Reversed assignment so that the first draw of a repeated number wins
+    lookup[numbers[::-1]] = np.arange(num_turns - 1, -1, -1, dtype=np.int32)
+
+    return lookup[boards]
+
+
+def win_turns(turns: np.ndarray, lines: Optional[WinLines] = None) -> np.ndarray:
+    """Turn at which each board wins
+    Args:
+        turns: (B, N, N) turn at which each cell gets crossed out
+        lines: Winning lines of the boards, rows and columns by default
+    Returns:
+        (B,) winning turns, len(numbers) for boards that never win
+    """
+    num_boards, size, _ = turns.shape
+    if lines is None:
+        lines = WinLines(size)
+    assert lines.size == size, "Winning lines don't match the board size!"
+
+    # The padding cell is crossed out before the first turn
+    padded = np.full((num_boards, size * size + 1), -1, dtype=turns.dtype)
+    padded[:, :-1] = turns.reshape(num_boards, -1)
+
+    return padded[:, lines.indices].max(axis=2).min(axis=1)
+
+
+def tournament(
+    numbers: np.ndarray, boards: np.ndarray, lines: Optional[WinLines] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Play all the boards at once and rank them by the order they win
+    Args:
+        numbers: Numbers to call out in order
+        boards: (B, N, N) stack of boards
+        lines: Winning lines of the boards, rows and columns by default
+    Returns:
+        Indices of the winning boards in order of winning and their scores
+    """
+    turns = draw_turns(numbers, boards)
+    wins = win_turns(turns, lines)
+
+    order = np.argsort(wins, kind="stable")
+    order = order[wins[order] < len(numbers)]
+    win_at = wins[order]
+
+    unmarked = turns[order] > win_at[:, None, None]
+    scores = (boards[order] * unmarked).sum(axis=(1, 2)) * numbers[win_at]
+
+    return order, scores
@@ -2,10 +2,16 @@
 """Line intersection"""
 
 import argparse
+import bisect
+import itertools
 import logging
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
 
 
 def arg_parser() -> argparse.Namespace:
@@ -25,6 +31,28 @@ def arg_parser() -> argparse.Namespace:
         default=Path("./main.log"),
         help="Path of log file",
     )
+    parser.add_argument(
+        "-m",
+        "--method",
+        choices=["raster", "sweep", "tiled"],
+        default="raster",
+        help="Rasterize the lines on a grid, sweep the lines without a grid or "
+        "rasterize tile by tile in parallel",
+    )
+    parser.add_argument(
+        "-t",
+        "--tile_size",
+        type=int,
+        default=256,
+        help="Width and height of a tile in tiled mode",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes in tiled mode",
+    )
 
     return parser.parse_args()
 
@@ -138,16 +166,335 @@ def count_all_overlap(data: List[List[int]]) -> int:
     return sum([1 for val in graph.values() if val > 1])
 
 
+def _rasterize(
+    segments: np.ndarray, diagonal: np.ndarray, width: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the flat indices of all the points covered by the segments
+    Args:
+        segments: (S, 4) array of x1, y1, x2, y2 end points
+        diagonal: (S,) mask of the diagonal segments
+        width: Width of the grid
+    Returns:
+        Flat index of every covered point and whether it is on a diagonal
+    """
+    xstart, ystart, xend, yend = segments.T
+    xstep = np.sign(xend - xstart)
+    ystep = np.sign(yend - ystart)
+    lengths = np.maximum(abs(xend - xstart), abs(yend - ystart)) + 1
+
+    seg_id = np.repeat(np.arange(len(segments)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    offsets = np.arange(lengths.sum()) - starts[seg_id]
+    xval = xstart[seg_id] + xstep[seg_id] * offsets
+    yval = ystart[seg_id] + ystep[seg_id] * offsets
+
+    return yval * width + xval, diagonal[seg_id]
+
+
+def _accumulate(grid: np.ndarray, flat: np.ndarray) -> int:
+    """Add the points to a grid of counts saturating at 2
+    Args:
+        grid: Flat int8 grid of counts, updated in place
+        flat: Flat indices of the points to add
+    Returns:
+        Number of points that became overlaps
+    """
+    points, counts = np.unique(flat, return_counts=True)
+    before = grid[points]
+    after = np.minimum(before + counts, 2).astype(np.int8)
+    grid[points] = after
+
+    return int(np.count_nonzero((before < 2) & (after == 2)))
+
+
+def _count_grid(
+    segments: np.ndarray, diagonal: np.ndarray, width: int, height: int, batch_size: int
+) -> Tuple[int, int]:
+    """Count the overlaps of the segments on a dense grid
+    Args:
+        segments: (S, 4) array of x1, y1, x2, y2 end points inside the grid
+        diagonal: (S,) mask of the diagonal segments
+        width: Width of the grid
+        height: Height of the grid
+        batch_size: Number of segments to rasterize at a time
+    Returns:
+        Count of horizontal and vertical overlaps and count of all overlaps
+    """
+    # Only "more than one" matters, so one byte per cell and per count is enough
+    straight = np.zeros(width * height, dtype=np.int8)
+    every = np.zeros(width * height, dtype=np.int8)
+    num_straight, num_all = 0, 0
+    for i in range(0, len(segments), batch_size):
+        batch = slice(i, i + batch_size)
+        flat, mask = _rasterize(segments[batch], diagonal[batch], width)
+        num_straight += _accumulate(straight, flat[~mask])
+        num_all += _accumulate(every, flat)
+
+    return num_straight, num_all
+
+
+def count_overlaps(data: List[List[int]], batch_size: int = 4096) -> Tuple[int, int]:
+    """Count the overlaps of horizontal and vertical lines, and of all lines
+    Args:
+        data: Input data
+        batch_size: Number of segments to rasterize at a time
+    Returns:
+        Count of horizontal and vertical overlaps and count of all overlaps
+    """
+    if not data:
+        logging.error("Input data is empty!")
+        return -1, -1
+
+    segments = np.array(data, dtype=np.int64)
+    diagonal = (segments[:, 0] != segments[:, 2]) & (segments[:, 1] != segments[:, 3])
+    width = int(segments[:, [0, 2]].max()) + 1
+    height = int(segments[:, [1, 3]].max()) + 1
+
+    return _count_grid(segments, diagonal, width, height, batch_size)
+
+
+def _split_tiles(
+    data: List[List[int]], tile_size: int
+) -> Dict[Tuple[int, int], Tuple[List[List[int]], List[bool]]]:
+    """Clip the segments to the square tiles they cross
+    Args:
+        data: Input data
+        tile_size: Width and height of a tile
+    Returns:
+        Pieces of segments in tile coordinates, and if they are diagonal, per tile
+    """
+    tiles: Dict[Tuple[int, int], Tuple[List[List[int]], List[bool]]] = {}
+    for xstart, ystart, xend, yend in data:
+        xstep = (xend > xstart) - (xend < xstart)
+        ystep = (yend > ystart) - (yend < ystart)
+        last = max(abs(xend - xstart), abs(yend - ystart))
+        pos = 0
+        while pos <= last:
+            xval, yval = xstart + xstep * pos, ystart + ystep * pos
+            xtile, ytile = xval // tile_size, yval // tile_size
+            xloc, yloc = xval - xtile * tile_size, yval - ytile * tile_size
+            # Steps left on this piece before leaving the tile or the segment
+            span = last - pos
+            if xstep:
+                span = min(span, tile_size - 1 - xloc if xstep > 0 else xloc)
+            if ystep:
+                span = min(span, tile_size - 1 - yloc if ystep > 0 else yloc)
+            pieces, diagonal = tiles.setdefault((xtile, ytile), ([], []))
+            pieces.append([xloc, yloc, xloc + xstep * span, yloc + ystep * span])
+            diagonal.append(bool(xstep and ystep))
+            pos += span + 1
+
+    return tiles
+
+
+def _count_tile(task: Tuple[List[List[int]], List[bool], int]) -> Tuple[int, int]:
+    """Count the overlaps within a single tile
+    Args:
+        task: Pieces of segments in tile coordinates, their diagonal mask and
+            the tile size
+    Returns:
+        Count of horizontal and vertical overlaps and count of all overlaps
+    """
+    pieces, diagonal, tile_size = task
+    return _count_grid(
+        np.array(pieces, dtype=np.int64),
+        np.array(diagonal, dtype=bool),
+        tile_size,
+        tile_size,
+        4096,
+    )
+
+
+def count_overlaps_tiled(
+    data: List[List[int]], tile_size: int = 256, workers: Optional[int] = None
+) -> Tuple[int, int]:
+    """Count the overlaps tile by tile in worker processes
+    Args:
+        data: Input data
+        tile_size: Width and height of a tile
+        workers: Number of worker processes, number of CPUs by default
+    Returns:
+        Count of horizontal and vertical overlaps and count of all overlaps
+    """
+    if not data:
+        logging.error("Input data is empty!")
+        return -1, -1
+
+    tiles = _split_tiles(data, tile_size)
+    tasks = ((pieces, diagonal, tile_size) for pieces, diagonal in tiles.values())
+    straight, total = 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for cnt, cnt_all in executor.map(_count_tile, tasks, chunksize=16):
+            straight += cnt
+            total += cnt_all
+
+    return straight, total
+
+
+# Orientations of the lines a segment can lie on
+HORIZONTAL, VERTICAL, DIAGONAL, ANTIDIAGONAL = range(4)
+
+
+def _line_coords(orient: int, xval: int, yval: int) -> Tuple[int, int]:
+    """Key of the line through a point and the position of the point on it
+    Args:
+        orient: Orientation of the line
+        xval: X position of point
+        yval: Y position of point
+    Returns:
+        Line key and position along the line
+    """
+    if orient == HORIZONTAL:
+        return yval, xval
+    if orient == VERTICAL:
+        return xval, yval
+    if orient == DIAGONAL:
+        return xval - yval, xval
+    return xval + yval, xval
+
+
+def _line_point(orient: int, key: int, pos: int) -> Tuple[int, int]:
+    """Point at a position along a line
+    Args:
+        orient: Orientation of the line
+        key: Line key
+        pos: Position along the line
+    Returns:
+        X and Y position of the point
+    """
+    if orient == HORIZONTAL:
+        return pos, key
+    if orient == VERTICAL:
+        return key, pos
+    if orient == DIAGONAL:
+        return pos, pos - key
+    return pos, key - pos
+
+
+def _sweep(
+    intervals: List[Tuple[int, int]],
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """Merge closed intervals on a line
+    Args:
+        intervals: Closed intervals of positions covered by segments
+    Returns:
+        Sorted intervals covered at least once and at least twice
+    """
+    events = [(lo, 1) for lo, _ in intervals] + [(hi + 1, -1) for _, hi in intervals]
+    events.sort()
+    covered: List[Tuple[int, int]] = []
+    doubles: List[Tuple[int, int]] = []
+    depth, cov_start, dbl_start = 0, 0, 0
+    for pos, group in itertools.groupby(events, key=lambda x: x[0]):
+        new_depth = depth + sum(delta for _, delta in group)
+        if depth < 1 <= new_depth:
+            cov_start = pos
+        elif new_depth < 1 <= depth:
+            covered.append((cov_start, pos - 1))
+        if depth < 2 <= new_depth:
+            dbl_start = pos
+        elif new_depth < 2 <= depth:
+            doubles.append((dbl_start, pos - 1))
+        depth = new_depth
+
+    return covered, doubles
+
+
+def _contains(intervals: List[Tuple[int, int]], pos: int) -> bool:
+    """Check if a position lies in sorted disjoint closed intervals
+    Args:
+        intervals: Sorted disjoint closed intervals
+        pos: Position to look up
+    Returns:
+        If the position is covered
+    """
+    i = bisect.bisect_right(intervals, (pos, sys.maxsize)) - 1
+    return i >= 0 and intervals[i][1] >= pos
+
+
+def count_overlaps_sweep(data: List[List[int]], diagonals: bool = True) -> int:
+    """Count the overlaps by merging intervals on every line, without a grid
+    Args:
+        data: Input data
+        diagonals: If diagonal lines are considered
+    Returns:
+        Count of overlaps
+    """
+    if not data:
+        logging.error("Input data is empty!")
+        return -1
+
+    groups: List[Dict[int, List[Tuple[int, int]]]] = [{} for _ in range(4)]
+    for xstart, ystart, xend, yend in data:
+        if ystart == yend:
+            orient = HORIZONTAL
+        elif xstart == xend:
+            orient = VERTICAL
+        elif not diagonals:
+            continue
+        elif (xend - xstart) * (yend - ystart) > 0:
+            orient = DIAGONAL
+        else:
+            orient = ANTIDIAGONAL
+        key, pos1 = _line_coords(orient, xstart, ystart)
+        _, pos2 = _line_coords(orient, xend, yend)
+        groups[orient].setdefault(key, []).append((min(pos1, pos2), max(pos1, pos2)))
+
+    lines = [{key: _sweep(val) for key, val in group.items()} for group in groups]
+    count = sum(
+        hi - lo + 1
+        for line in lines
+        for _, doubles in line.values()
+        for lo, hi in doubles
+    )
+
+    # Points covered by two lines of different orientations
+    crossings: Set[Tuple[int, int]] = set()
+    for orient_a, orient_b in itertools.combinations(range(4), 2):
+        keys_b = sorted(lines[orient_b])
+        for key_a, (covered_a, _) in lines[orient_a].items():
+            # Key of the line b through the point at pos on line a is slope*pos+base
+            base = _line_coords(orient_b, *_line_point(orient_a, key_a, 0))[0]
+            slope = _line_coords(orient_b, *_line_point(orient_a, key_a, 1))[0] - base
+            for lo, hi in covered_a:
+                kmin, kmax = sorted((slope * lo + base, slope * hi + base))
+                start = bisect.bisect_left(keys_b, kmin)
+                stop = bisect.bisect_right(keys_b, kmax)
+                for key_b in keys_b[start:stop]:
+                    pos_a, rem = divmod(key_b - base, slope)
+                    if rem:
+                        continue
+                    point = _line_point(orient_a, key_a, pos_a)
+                    pos_b = _line_coords(orient_b, *point)[1]
+                    if _contains(lines[orient_b][key_b][0], pos_b):
+                        crossings.add(point)
+
+    # A crossing is counted once, however many of its lines already counted it
+    for point in crossings:
+        count += 1
+        for orient, line in enumerate(lines):
+            key, pos = _line_coords(orient, *point)
+            if key in line and _contains(line[key][1], pos):
+                count -= 1
+
+    return count
+
+
 def main() -> None:
     """Main function"""
     args = arg_parser()
     setup_logger(args.log_path)
 
     data = read_file(args.file_path)
-    ans = count_horiz_vert_overlap(data)
+    if args.method == "sweep":
+        ans = count_overlaps_sweep(data, diagonals=False)
+        ans2 = count_overlaps_sweep(data)
+    elif args.method == "tiled":
+        ans, ans2 = count_overlaps_tiled(data, args.tile_size, args.workers)
+    else:
+        ans, ans2 = count_overlaps(data)
     assert ans == 5608
     print(f"Horizontal and vertical overlaps: {ans}")
-    ans2 = count_all_overlap(data)
     assert ans2 == 20299
     print(f"All overlap: {ans2}")
 
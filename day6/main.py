@@ -2,9 +2,12 @@
 """Lantern fish counting"""
 
 import argparse
+import functools
 import logging
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
 
 
 def arg_parser() -> argparse.Namespace:
@@ -24,6 +27,27 @@ def arg_parser() -> argparse.Namespace:
         default=Path("./main.log"),
         help="Path of log file",
     )
+    parser.add_argument(
+        "-m",
+        "--method",
+        choices=["naive", "fast", "matrix", "table"],
+        default="table",
+        help="Method used to count the lantern fishes, naive only applies to part 1",
+    )
+    parser.add_argument(
+        "-c",
+        "--cache_path",
+        type=Path,
+        default=None,
+        help="Path of the growth table cache file",
+    )
+    parser.add_argument(
+        "-s",
+        "--series_path",
+        type=Path,
+        default=None,
+        help="Path of the .npy file to write the population of every day to",
+    )
 
     return parser.parse_args()
 
@@ -111,6 +135,275 @@ def count_lanternfishes_fast(days: int, data: List[int]) -> int:
     return sum(ctr.values())
 
 
+# Number of possible timer values of a lanternfish
+NUM_TIMERS = 9
+
+# Longest horizon the naive method can simulate, the school grows ~10x per month
+NAIVE_MAX_DAYS = 100
+
+Matrix = List[List[int]]
+
+
+def _transition_matrix() -> Matrix:
+    """Matrix mapping the timer histogram of a day to that of the next day
+    Returns:
+        9x9 transition matrix
+    """
+    mat = [[0] * NUM_TIMERS for _ in range(NUM_TIMERS)]
+    for timer in range(1, NUM_TIMERS):
+        mat[timer - 1][timer] = 1
+    mat[6][0] = 1
+    mat[8][0] = 1
+
+    return mat
+
+
+def _mat_mult(left: Matrix, right: Matrix, modulus: Optional[int] = None) -> Matrix:
+    """Multiply two square matrices
+    Args:
+        left: Left matrix
+        right: Right matrix
+        modulus: Reduce the entries modulo this value if given
+    Returns:
+        Product of the matrices
+    """
+    size = len(left)
+    res = [[0] * size for _ in range(size)]
+    for i, row in enumerate(left):
+        for k, val in enumerate(row):
+            if val:
+                for j, rval in enumerate(right[k]):
+                    res[i][j] += val * rval
+        if modulus:
+            res[i] = [val % modulus for val in res[i]]
+
+    return res
+
+
+def _mat_pow(mat: Matrix, power: int, modulus: Optional[int] = None) -> Matrix:
+    """Raise a square matrix to a power by repeated squaring
+    Args:
+        mat: Matrix
+        power: Non negative power
+        modulus: Reduce the entries modulo this value if given
+    Returns:
+        Matrix to the given power
+    """
+    size = len(mat)
+    res = [[int(i == j) for j in range(size)] for i in range(size)]
+    while power:
+        if power & 1:
+            res = _mat_mult(res, mat, modulus)
+        mat = _mat_mult(mat, mat, modulus)
+        power >>= 1
+
+    return res
+
+
+def count_lanternfishes_matrix(
+    days: int, data: List[int], modulus: Optional[int] = None
+) -> int:
+    """Count the number of lanternfishes after given number of days in
+    O(log days) by exponentiating the transition matrix of the timer histogram
+    Args:
+        days: Number of days to simulate
+        data: Input data
+        modulus: Count modulo this value if given, for very long horizons
+    Returns:
+        Count of the number of lantern fishes
+    """
+    hist = [0] * NUM_TIMERS
+    for timer in data:
+        hist[timer] += 1
+
+    mat = _mat_pow(_transition_matrix(), days, modulus)
+    count = sum(val * cnt for row in mat for val, cnt in zip(row, hist))
+
+    return count % modulus if modulus else count
+
+
+@functools.lru_cache(maxsize=8)
+def growth_table(max_days: int, modulus: Optional[int] = None) -> np.ndarray:
+    """Number of descendants of a single fish, including itself
+    Args:
+        max_days: Largest number of days in the table
+        modulus: Keep the counts modulo this value as int64 if given, otherwise
+            keep them as exact Python ints
+    Returns:
+        (9, max_days + 1) table of the count after d days for a fish of timer t
+    """
+    assert modulus is None or 0 < modulus < 2**30, "Modulus should fit 30 bits!"
+    col = [1] * NUM_TIMERS
+    cols = [col]
+    for _ in range(max_days):
+        col = [col[6] + col[8]] + col[:-1]
+        if modulus:
+            col = [val % modulus for val in col]
+        cols.append(col)
+
+    table = np.array(cols, dtype=np.int64 if modulus else object).T
+    table.flags.writeable = False
+    return table
+
+
+def load_growth_table(
+    max_days: int, modulus: Optional[int] = None, cache_path: Optional[Path] = None
+) -> np.ndarray:
+    """Load the growth table from a cache file, or compute and save it
+    Args:
+        max_days: Largest number of days needed in the table
+        modulus: Keep the counts modulo this value if given
+        cache_path: Path of the cache file, the table is not saved if None
+    Returns:
+        Growth table covering at least max_days days
+    """
+    if cache_path is not None and cache_path.exists():
+        # Exact counts are stored as decimal strings so no pickle is ever loaded
+        try:
+            with np.load(cache_path) as cache:
+                table = cache["table"]
+                cached_modulus = int(cache["modulus"])
+        except (OSError, ValueError, KeyError):
+            logging.error("Cache '%s' is not a valid growth table!", cache_path)
+        else:
+            if cached_modulus == (modulus or 0) and table.shape[1] > max_days:
+                if not modulus:
+                    table = np.vectorize(int, otypes=[object])(table)
+                return table
+            logging.info(
+                "Cache '%s' doesn't cover %d days, recomputing", cache_path, max_days
+            )
+
+    table = growth_table(max_days, modulus)
+    if cache_path is not None:
+        with cache_path.open("wb") as fptr:
+            np.savez(
+                fptr,
+                table=table if modulus else table.astype(str),
+                modulus=modulus or 0,
+            )
+
+    return table
+
+
+def timer_histogram(data: Sequence[int]) -> np.ndarray:
+    """Count the fishes per timer value
+    Args:
+        data: Timers of the fishes of a school
+    Returns:
+        (9,) histogram of the timers
+    """
+    return np.bincount(np.asarray(data, dtype=np.int64), minlength=NUM_TIMERS)
+
+
+def count_lanternfishes_batch(
+    histograms: np.ndarray,
+    days: Sequence[int],
+    table: np.ndarray,
+    modulus: Optional[int] = None,
+) -> np.ndarray:
+    """Count the lanternfishes of many schools after many horizons at once
+    Args:
+        histograms: (Q, 9) timer histograms of the schools
+        days: (Q,) number of days to simulate for each school
+        table: Growth table covering the largest number of days
+        modulus: Modulus the table was computed with, if any
+    Returns:
+        (Q,) count of the number of lantern fishes per query
+    """
+    cols = table[:, np.asarray(days)].T
+    if modulus:
+        hists = np.asarray(histograms, dtype=np.int64) % modulus
+        return ((hists * cols) % modulus).sum(axis=1) % modulus
+
+    return (np.asarray(histograms).astype(object) * cols).sum(axis=1)
+
+
+def count_lanternfishes(
+    days: int,
+    data: List[int],
+    method: str = "table",
+    cache_path: Optional[Path] = None,
+) -> int:
+    """Count the number of lanternfishes after given number of days
+    Args:
+        days: Number of days to simulate
+        data: Input data
+        method: One of naive, fast, matrix or table
+        cache_path: Path of the growth table cache file for the table method
+    Returns:
+        Count of the number of lantern fishes
+    """
+    if method == "naive":
+        if days > NAIVE_MAX_DAYS:
+            logging.error(
+                "Naive method is limited to %d days, got %d!", NAIVE_MAX_DAYS, days
+            )
+            return -1
+        return count_lanternfishes_naive(days, data)
+    if method == "fast":
+        return count_lanternfishes_fast(days, data)
+    if method == "matrix":
+        return count_lanternfishes_matrix(days, data)
+
+    table = load_growth_table(days, cache_path=cache_path)
+    return int(count_lanternfishes_batch(timer_histogram(data)[None], [days], table)[0])
+
+
+def simulate_lanternfishes(
+    days: int,
+    data: List[int],
+    out_path: Optional[Path] = None,
+    modulus: Optional[int] = None,
+) -> np.ndarray:
+    """Simulate the population of every day with a 9 slot ring buffer
+    Args:
+        days: Number of days to simulate
+        data: Input data
+        out_path: Write the population to a memory mapped .npy file if given
+        modulus: Count modulo this value as int64 if given, otherwise keep exact
+            Python ints in memory, a memory mapped file is then limited to int64
+    Returns:
+        (days + 1,) count of the number of lantern fishes on every day
+    """
+    int64_max = int(np.iinfo(np.int64).max)
+    assert modulus is None or 0 < modulus <= int64_max, "Modulus should fit int64!"
+    series: np.ndarray
+    if out_path is not None:
+        series = np.lib.format.open_memmap(
+            out_path, mode="w+", dtype=np.int64, shape=(days + 1,)
+        )
+    else:
+        series = np.empty(days + 1, dtype=np.int64 if modulus else object)
+
+    ring = [0] * NUM_TIMERS
+    for timer in data:
+        ring[timer] += 1
+
+    # The slot at head holds timer 0, the one before it timer 8
+    head = 0
+    total = len(data) % modulus if modulus else len(data)
+    series[0] = total
+    for day in range(1, days + 1):
+        zeros = ring[head]
+        head = (head + 1) % NUM_TIMERS
+        ring[(head + 6) % NUM_TIMERS] += zeros
+        total += zeros
+        if modulus:
+            ring[(head + 6) % NUM_TIMERS] %= modulus
+            total %= modulus
+        elif total > int64_max and series.dtype != object:
+            raise OverflowError(
+                f"Population of day {day} doesn't fit int64, give a modulus!"
+            )
+        series[day] = total
+
+    if isinstance(series, np.memmap):
+        series.flush()
+
+    return series
+
+
 def main() -> None:
     """Main function"""
     args = arg_parser()
@@ -118,13 +411,20 @@ def main() -> None:
 
     data = read_file(args.file_path)
 
-    ans = count_lanternfishes_naive(80, data)
+    ans = count_lanternfishes(80, data, args.method, args.cache_path)
     assert ans == 391671
     print(f"Number of lantern fishes: {ans}")
-    ans2 = count_lanternfishes_fast(256, data)
+    # The naive school of the second part wouldn't fit in memory
+    method = "fast" if args.method == "naive" else args.method
+    ans2 = count_lanternfishes(256, data, method, args.cache_path)
     assert ans2 == 1754000560399
     print(f"Number of lantern fishes: {ans2}")
 
+    if args.series_path is not None:
+        series = simulate_lanternfishes(256, data, args.series_path)
+        assert series[80] == ans and series[-1] == ans2
+        logging.info("Population of every day written to '%s'", args.series_path)
+
 
 if __name__ == "__main__":
     main()
@@ -6,7 +6,9 @@ import logging
 import statistics
 import sys
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
 
 
 def arg_parser() -> argparse.Namespace:
@@ -26,6 +28,12 @@ def arg_parser() -> argparse.Namespace:
         default=Path("./main.log"),
         help="Path of log file",
     )
+    parser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        help="Stream the input in chunks into a histogram of positions",
+    )
 
     return parser.parse_args()
 
@@ -66,6 +74,81 @@ def read_file(file_path: Path) -> List[int]:
     return lines
 
 
+def read_file_chunks(
+    file_path: Path, chunk_size: int = 1 << 20
+) -> Iterator[np.ndarray]:
+    """Read the comma separated input file lazily
+    Args:
+        file_path: Path of input file
+        chunk_size: Number of characters to read at a time
+    Returns:
+        Generator of arrays of positions
+    """
+    try:
+        with file_path.open("r") as fptr:
+            carry = ""
+            for buf in iter(lambda: fptr.read(chunk_size), ""):
+                # The last number may continue in the next chunk
+                head, sep, carry = (carry + buf).rpartition(",")
+                if sep:
+                    yield np.array(head.split(","), dtype=np.int64)
+            if carry.strip():
+                yield np.array([carry], dtype=np.int64)
+    except FileNotFoundError:
+        logging.error("File '%s' not found!", file_path)
+
+
+def position_histogram(chunks: Iterator[np.ndarray]) -> Tuple[int, np.ndarray]:
+    """Count the crabs at every position, one chunk of positions at a time
+    Args:
+        chunks: Chunks of positions
+    Returns:
+        Min position and the number of crabs at every position from it onwards
+    """
+    low = 0
+    counts = np.zeros(0, dtype=np.int64)
+    for chunk in chunks:
+        if not chunk.size:
+            continue
+        cmin, cmax = int(chunk.min()), int(chunk.max())
+        if not counts.any():
+            low = cmin
+        new_low = min(low, cmin)
+        size = max(low + len(counts), cmax + 1) - new_low
+        if new_low != low or size != len(counts):
+            grown = np.zeros(size, dtype=np.int64)
+            grown[low - new_low : low - new_low + len(counts)] = counts
+            low, counts = new_low, grown
+        part = np.bincount(chunk - low)
+        counts[: len(part)] += part
+
+    return low, counts
+
+
+def min_horizontal_change_stream(
+    file_path: Path, chunk_size: int = 1 << 20
+) -> Tuple[int, int]:
+    """Caculate the minimum change to align horizontal positions for both fuel
+    models, without holding all the positions in memory
+    Args:
+        file_path: Path of input file
+        chunk_size: Number of characters to read at a time
+    Returns
+        Min fuel for constant and arithmetic progression moves
+    """
+    _, counts = position_histogram(read_file_chunks(file_path, chunk_size))
+    if not counts.any():
+        logging.error("Input data is empty!")
+        return -1, -1
+
+    cum = np.cumsum(counts)
+    med = int(np.searchsorted(cum, (cum[-1] + 1) // 2))
+    dist = np.abs(np.arange(len(counts), dtype=np.int64) - med)
+    _, triangular = histogram_fuel_costs(counts)
+
+    return int((counts * dist).sum()), int(triangular.min())
+
+
 def min_horizontal_change(data: List[int]) -> int:
     """Caculate the minimum change to align horizontal positions
     Args:
@@ -88,7 +171,7 @@ def min_horizontal_change_2(data: List[int]) -> int:
     min_fuel = sys.maxsize
     min_val = min(data)
     max_val = max(data)
-    for j in range(min_val, max_val):
+    for j in range(min_val, max_val + 1):
         sum_ = 0
         for i in data:
             dist = abs(i - j)
@@ -99,17 +182,172 @@ def min_horizontal_change_2(data: List[int]) -> int:
     return min_fuel
 
 
+def fuel_costs(data: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuel needed to align at every position between the min and max position,
+    using prefix sums over a histogram of the positions
+    Args:
+        data: Input data
+    Returns:
+        Fuel per candidate position for constant and arithmetic progression moves
+    """
+    positions = np.asarray(data, dtype=np.int64)
+    return histogram_fuel_costs(np.bincount(positions - positions.min()))
+
+
+def histogram_fuel_costs(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuel needed to align at every position of a histogram of positions
+    Args:
+        counts: Number of crabs at every position from the min position onwards
+    Returns:
+        Fuel per candidate position for constant and arithmetic progression moves
+    """
+    xval = np.arange(len(counts), dtype=np.int64)
+
+    # Crabs and sum of their positions at or left of every candidate
+    cnt_left = np.cumsum(counts)
+    sum_left = np.cumsum(counts * xval)
+    cnt_total, sum_total = int(cnt_left[-1]), int(sum_left[-1])
+    sq_total = int((counts * xval * xval).sum())
+
+    linear = (
+        xval * cnt_left
+        - sum_left
+        + (sum_total - sum_left)
+        - xval * (cnt_total - cnt_left)
+    )
+    # d * (d + 1) / 2 summed is half of the squared distances plus the distances
+    square = sq_total - 2 * xval * sum_total + xval * xval * cnt_total
+    return linear, (square + linear) // 2
+
+
+def min_total_fuel(data: List[int]) -> Tuple[int, int]:
+    """Minimum fuel to align the horizontal positions for both fuel models
+    Args:
+        data: Input data
+    Returns:
+        Min fuel for constant and arithmetic progression moves
+    """
+    linear, triangular = fuel_costs(data)
+    return int(linear.min()), int(triangular.min())
+
+
+class FuelModel(NamedTuple):
+    """Fuel needed to move a crab by a distance
+    Attributes:
+        cost: Vectorized fuel for an array of distances
+        convex: If the total fuel is convex in the target position
+        candidates: Closed form candidate positions given positions and weights
+    """
+
+    cost: Callable[[np.ndarray], np.ndarray]
+    convex: bool = True
+    candidates: Optional[Callable[[np.ndarray, np.ndarray], List[int]]] = None
+
+
+def _weighted_median(positions: np.ndarray, weights: np.ndarray) -> List[int]:
+    """Weighted median minimizing the sum of weighted distances
+    Args:
+        positions: Crab positions
+        weights: Weight of every crab
+    Returns:
+        Weighted median as the only candidate
+    """
+    order = np.argsort(positions, kind="stable")
+    cum = np.cumsum(weights[order])
+    return [int(positions[order[np.searchsorted(cum, cum[-1] / 2)]])]
+
+
+def _mean_neighbours(positions: np.ndarray, weights: np.ndarray) -> List[int]:
+    """Integers around the weighted mean, within half a step of the optimum of
+    the arithmetic progression fuel
+    Args:
+        positions: Crab positions
+        weights: Weight of every crab
+    Returns:
+        Candidate positions
+    """
+    mean = float((positions * weights).sum() / weights.sum())
+    return list(range(int(np.floor(mean - 0.5)), int(np.ceil(mean + 0.5)) + 1))
+
+
+LINEAR = FuelModel(np.abs, candidates=_weighted_median)
+TRIANGULAR = FuelModel(lambda dist: dist * (dist + 1) // 2, candidates=_mean_neighbours)
+QUADRATIC = FuelModel(lambda dist: dist * dist)
+
+
+def capped(cap: int) -> FuelModel:
+    """Linear fuel that never exceeds a cap, which is not convex
+    Args:
+        cap: Max fuel for any move
+    Returns:
+        Fuel model
+    """
+    return FuelModel(lambda dist: np.minimum(dist, cap), convex=False)
+
+
+def total_fuel(
+    positions: np.ndarray, weights: np.ndarray, target: int, model: FuelModel
+) -> int:
+    """Total fuel needed to align all crabs at a target position
+    Args:
+        positions: Crab positions
+        weights: Weight of every crab
+        target: Position to align at
+        model: Fuel model
+    Returns:
+        Total fuel
+    """
+    return int((weights * model.cost(np.abs(positions - target))).sum())
+
+
+def optimal_position(
+    data: List[int], model: FuelModel, weights: Optional[List[int]] = None
+) -> Tuple[int, int]:
+    """Find the position needing the least fuel to align all the crabs
+    Args:
+        data: Input data
+        model: Fuel model
+        weights: Weight of every crab, 1 by default
+    Returns:
+        Best position and its total fuel
+    """
+    positions = np.asarray(data, dtype=np.int64)
+    weight = np.ones_like(positions) if weights is None else np.asarray(weights)
+    low, high = int(positions.min()), int(positions.max())
+
+    def fuel(target: int) -> int:
+        return total_fuel(positions, weight, target, model)
+
+    if model.candidates is not None:
+        candidates = [
+            min(max(val, low), high) for val in model.candidates(positions, weight)
+        ]
+    elif model.convex:
+        # Bisect on the sign of the discrete slope of the convex total fuel
+        while low < high:
+            mid = (low + high) // 2
+            if fuel(mid) <= fuel(mid + 1):
+                high = mid
+            else:
+                low = mid + 1
+        candidates = [low]
+    else:
+        candidates = list(range(low, high + 1))
+
+    return min(((val, fuel(val)) for val in candidates), key=lambda x: x[1])
+
+
 def main() -> None:
     """Main function"""
     args = arg_parser()
     setup_logger(args.log_path)
 
-    data = read_file(args.file_path)
-
-    ans = min_horizontal_change(data)
+    if args.stream:
+        ans, ans2 = min_horizontal_change_stream(args.file_path)
+    else:
+        ans, ans2 = min_total_fuel(read_file(args.file_path))
     print(f"Min fuel: {ans}")
     assert ans == 336120
-    ans2 = min_horizontal_change_2(data)
     assert ans2 == 96864235
     print(f"Min fuel: {ans2}")
 
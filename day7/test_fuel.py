@@ -0,0 +1,24 @@
+"""Tests for day 7"""
+
+import numpy as np
+
+from main import LINEAR, QUADRATIC, TRIANGULAR, capped, optimal_position, total_fuel
+
+
+def test_optimal_position():
+    """Test every fuel model against scanning all the positions"""
+    rng = np.random.default_rng(0)
+    models = [LINEAR, TRIANGULAR, QUADRATIC, capped(5), capped(40)]
+    for _ in range(50):
+        positions = rng.integers(100, size=rng.integers(1, 30))
+        for weights in [None, rng.integers(1, 10, size=len(positions)).tolist()]:
+            weight = np.ones_like(positions) if weights is None else np.array(weights)
+            for model in models:
+                best, fuel = optimal_position(positions.tolist(), model, weights)
+                brute = min(
+                    total_fuel(positions, weight, target, model)
+                    for target in range(positions.min(), positions.max() + 1)
+                )
+                assert positions.min() <= best <= positions.max()
+                assert fuel == brute
+                assert total_fuel(positions, weight, best, model) == brute
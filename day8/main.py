@@ -2,9 +2,12 @@
 """Seven segment search"""
 
 import argparse
+import itertools
 import logging
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
+
+import numpy as np
 
 
 def arg_parser() -> argparse.Namespace:
@@ -24,6 +27,14 @@ def arg_parser() -> argparse.Namespace:
         default=Path("./main.log"),
         help="Path of log file",
     )
+    parser.add_argument(
+        "-m",
+        "--method",
+        choices=["list", "batch", "stream"],
+        default="stream",
+        help="Decode entry by entry, all entries at once with arrays or batches "
+        "of entries while reading the file",
+    )
 
     return parser.parse_args()
 
@@ -67,6 +78,109 @@ def read_file(file_path: Path) -> Tuple[List[List[str]], List[List[str]]]:
     return patterns, digits
 
 
+# Sum over the segments of a digit of the number of digits that light up each
+# segment, which is unique per digit
+SIGNATURE_DIGIT = {42: 0, 17: 1, 34: 2, 39: 3, 30: 4, 37: 5, 41: 6, 25: 7, 49: 8, 45: 9}
+
+# Map from a digit signature to the digit, -1 for invalid signatures
+DIGIT_TABLE = np.full(256, -1, dtype=np.int64)
+DIGIT_TABLE[list(SIGNATURE_DIGIT)] = list(SIGNATURE_DIGIT.values())
+
+
+def _tokens_to_masks(tokens: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert the tokens of whole entries into segment bit masks
+    Args:
+        tokens: Whitespace separated tokens of the entries, 15 per entry
+    Returns:
+        (N, 10) pattern masks and (N, 4) output digit masks
+    """
+    if not tokens:
+        return np.zeros((0, 10), dtype=np.uint8), np.zeros((0, 4), dtype=np.uint8)
+
+    assert len(tokens) % 15 == 0 and tokens[10::15] == ["|"] * (len(tokens) // 15)
+    del tokens[10::15]
+
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+    chars = np.frombuffer("".join(tokens).encode("ascii"), dtype=np.uint8)
+    bits = np.left_shift(1, chars - ord("a")).astype(np.uint8)
+    masks = np.bitwise_or.reduceat(bits, np.cumsum(lengths) - lengths).reshape(-1, 14)
+
+    return masks[:, :10], masks[:, 10:]
+
+
+def read_file_masks(file_path: Path) -> Tuple[np.ndarray, np.ndarray]:
+    """Read input file straight into segment bit masks
+    Args:
+        file_path: Path of input file
+    Returns:
+        (N, 10) pattern masks and (N, 4) output digit masks
+    """
+    tokens: List[str] = []
+    try:
+        tokens = file_path.read_text().split()
+    except FileNotFoundError:
+        logging.error("File '%s' not found!", file_path)
+
+    return _tokens_to_masks(tokens)
+
+
+def read_file_batches(
+    file_path: Path, batch_size: int = 65536
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Read input file lazily into segment bit masks, a batch of lines at a time
+    Args:
+        file_path: Path of input file
+        batch_size: Number of lines per batch
+    Returns:
+        Generator of (B, 10) pattern masks and (B, 4) output digit masks
+    """
+    try:
+        with file_path.open("r") as fptr:
+            for lines in iter(lambda: list(itertools.islice(fptr, batch_size)), []):
+                yield _tokens_to_masks(" ".join(lines).split())
+    except FileNotFoundError:
+        logging.error("File '%s' not found!", file_path)
+
+
+def decode_masks(patterns: np.ndarray, outputs: np.ndarray) -> Tuple[int, int]:
+    """Count the 1, 4, 7 and 8's and sum the decoded outputs of all displays
+    Args:
+        patterns: (N, 10) pattern masks
+        outputs: (N, 4) output digit masks
+    Returns:
+        Count of 1, 4, 7 or 8's and sum of the decoded output values
+    """
+    out_bits = np.unpackbits(outputs[..., None], axis=-1, bitorder="little")
+    lit = out_bits.sum(axis=-1)
+    count = int(np.isin(lit, [2, 3, 4, 7]).sum())
+
+    pat_bits = np.unpackbits(patterns[..., None], axis=-1, bitorder="little")
+    freq = pat_bits.sum(axis=1, dtype=np.int64)
+    signatures = (out_bits * freq[:, None, :]).sum(axis=-1)
+    digits = DIGIT_TABLE[signatures]
+    assert (digits >= 0).all(), "Undecodable output digit!"
+
+    return count, int((digits @ np.array([1000, 100, 10, 1])).sum())
+
+
+def decode_stream(file_path: Path, batch_size: int = 65536) -> Tuple[int, int]:
+    """Count the 1, 4, 7 and 8's and sum the decoded outputs in a single pass
+    over the input file, holding only one batch of lines in memory
+    Args:
+        file_path: Path of input file
+        batch_size: Number of lines per batch
+    Returns:
+        Count of 1, 4, 7 or 8's and sum of the decoded output values
+    """
+    count, total = 0, 0
+    for patterns, outputs in read_file_batches(file_path, batch_size):
+        batch_count, batch_total = decode_masks(patterns, outputs)
+        count += batch_count
+        total += batch_total
+
+    return count, total
+
+
 def count_1478_pattern(data: List[List[str]]) -> int:
     """Count the number of occurences for the patterns of 1, 4, 7 or 8
     Args:
@@ -79,6 +193,42 @@ def count_1478_pattern(data: List[List[str]]) -> int:
     return cnt
 
 
+def encode(pattern: str) -> int:
+    """Encode a pattern of segments as a 7-bit mask
+    Args:
+        pattern: Segments a to g that are lit
+    Returns:
+        Bit mask with bit i set for the i-th segment
+    """
+    mask = 0
+    for char in pattern:
+        mask |= 1 << (ord(char) - ord("a"))
+
+    return mask
+
+
+def decode_entry(pattern: List[str], digit: List[str]) -> int:
+    """Decode the output digits of a single display
+    Args:
+        pattern: Patterns of the ten digits
+        digit: Patterns of the output digits
+    Returns:
+        Decoded output value
+    """
+    masks = [encode(pat) for pat in pattern]
+    freq = [sum((mask >> bit) & 1 for mask in masks) for bit in range(7)]
+    table = {
+        mask: SIGNATURE_DIGIT[sum(freq[bit] for bit in range(7) if (mask >> bit) & 1)]
+        for mask in masks
+    }
+
+    res = 0
+    for dig in digit:
+        res = res * 10 + table[encode(dig)]
+
+    return res
+
+
 def sum_decode_digit(patterns: List[List[str]], digits: List[List[str]]) -> int:
     """Sum of all the digits decoded using the patterns
     Args:
@@ -87,59 +237,7 @@ def sum_decode_digit(patterns: List[List[str]], digits: List[List[str]]) -> int:
     Returns:
         Sum of the decoded digits
     """
-    count = 0
-    for i, pat in enumerate(patterns):
-        pat1 = set(list(filter(lambda x: len(x) == 2, pat))[0])
-        pat4 = set(list(filter(lambda x: len(x) == 4, pat))[0])
-        pat7 = set(list(filter(lambda x: len(x) == 3, pat))[0])
-        pat8 = set(list(filter(lambda x: len(x) == 7, pat))[0])
-        pat3 = set(
-            list(filter(lambda x, tmp=pat1: len(x) == 5 and tmp.issubset(set(x)), pat))[
-                0
-            ]
-        )
-        pat9 = pat4 | pat3
-        pat2 = set(
-            list(filter(lambda x, tmp=(pat8 - pat9): len(x) == 5 and tmp.issubset(set(x)), pat))[
-                0
-            ]
-        )
-        pat6 = set(
-            list(
-                filter(
-                    lambda x, tmp=pat1: len(x) == 6 and not tmp.issubset(set(x)), pat
-                )
-            )[0]
-        )
-        pat5 = set(
-            list(filter(lambda x, tmp=(pat8 - pat2): len(x) == 5 and tmp.issubset(set(x)), pat))[
-                0
-            ]
-        )
-        res = ""
-        for dig in digits[i]:
-            if set(dig) == pat1:
-                res += "1"
-            elif set(dig) == pat2:
-                res += "2"
-            elif set(dig) == pat3:
-                res += "3"
-            elif set(dig) == pat4:
-                res += "4"
-            elif set(dig) == pat5:
-                res += "5"
-            elif set(dig) == pat6:
-                res += "6"
-            elif set(dig) == pat7:
-                res += "7"
-            elif set(dig) == pat8:
-                res += "8"
-            elif set(dig) == pat9:
-                res += "9"
-            else:
-                res += "0"
-        count += int(res)
-    return count
+    return sum(decode_entry(pat, dig) for pat, dig in zip(patterns, digits))
 
 
 def main() -> None:
@@ -147,12 +245,17 @@ def main() -> None:
     args = arg_parser()
     setup_logger(args.log_path)
 
-    patterns, digits = read_file(args.file_path)
+    if args.method == "stream":
+        ans, ans2 = decode_stream(args.file_path)
+    elif args.method == "batch":
+        ans, ans2 = decode_masks(*read_file_masks(args.file_path))
+    else:
+        patterns, digits = read_file(args.file_path)
+        ans = count_1478_pattern(digits)
+        ans2 = sum_decode_digit(patterns, digits)
 
-    ans = count_1478_pattern(digits)
     assert ans == 330
     print(f"Number of 1,4,7 or 8's: {ans}")
-    ans2 = sum_decode_digit(patterns, digits)
     assert ans2 == 1010472
     print(f"Sum of all decoded output digits: {ans2}")
 
@@ -2,10 +2,13 @@
 """Smoke Basin low points"""
 
 import argparse
+import heapq
 import logging
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 import numpy as np
 
@@ -27,6 +30,20 @@ def arg_parser() -> argparse.Namespace:
         default=Path("./main.log"),
         help="Path of log file",
     )
+    parser.add_argument(
+        "-b",
+        "--band_rows",
+        type=int,
+        default=1024,
+        help="Number of rows per band for .npy heightmaps",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes for .npy heightmaps",
+    )
 
     return parser.parse_args()
 
@@ -97,23 +114,31 @@ def get_neighbours(data: np.ndarray, i: int, j: int) -> Tuple[List[int], List[in
     return row_list, col_list
 
 
-def get_low_points(data: np.ndarray) -> Tuple[List[int], List[int]]:
+def low_point_mask(data: np.ndarray) -> np.ndarray:
+    """Mask of the points lower than all of their neighbours
+    Args:
+        data: Input data
+    Returns:
+        Boolean mask of the low points
+    """
+    padded = np.pad(data, 1, constant_values=10)
+    center = padded[1:-1, 1:-1]
+    return (
+        (center < padded[:-2, 1:-1])
+        & (center < padded[2:, 1:-1])
+        & (center < padded[1:-1, :-2])
+        & (center < padded[1:-1, 2:])
+    )
+
+
+def get_low_points(data: np.ndarray) -> Tuple[np.ndarray, ...]:
     """Get the number of low points in the smoke basin
     Args:
         data: Input data
     Returns:
         The low points
     """
-    row, col = data.shape
-    rows_list, cols_list = [], []
-    for i in range(row):
-        for j in range(col):
-            r_list, c_list = get_neighbours(data, i, j)
-            if (data[i, j] < data[r_list, c_list]).all():
-                rows_list.append(i)
-                cols_list.append(j)
-
-    return rows_list, cols_list
+    return np.nonzero(low_point_mask(data))
 
 
 def sum_num_low_points(data: np.ndarray) -> int:
@@ -123,35 +148,78 @@ def sum_num_low_points(data: np.ndarray) -> int:
     Returns:
         Sum of the risk scores
     """
-    row_list, col_list = get_low_points(data)
-    return (data[row_list, col_list]).sum() + len(row_list)
+    return int((data[low_point_mask(data)] + 1).sum())
+
+
+def _find_roots(parent: np.ndarray) -> np.ndarray:
+    """Point every node of a union-find forest directly at its root
+    Args:
+        parent: Parent of every node
+    Returns:
+        Root of every node
+    """
+    grand = parent[parent]
+    while (grand != parent).any():
+        parent = grand
+        grand = parent[parent]
+
+    return parent
 
 
-def get_basin_sizes(data: np.ndarray) -> List[int]:
+def _union_edges(num_nodes: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Vectorized union-find of the nodes joined by edges
+    Args:
+        num_nodes: Number of nodes
+        left: One end of every edge
+        right: Other end of every edge
+    Returns:
+        Root of every node, the smallest node of its component
+    """
+    # Hook the larger root of every edge under the smaller one until all
+    # edges are within a tree, parents only ever decrease so there are no cycles
+    parent = np.arange(num_nodes)
+    while left.size:
+        root_l, root_r = parent[left], parent[right]
+        keep = root_l != root_r
+        left, right = left[keep], right[keep]
+        root_l, root_r = root_l[keep], root_r[keep]
+        np.minimum.at(parent, np.maximum(root_l, root_r), np.minimum(root_l, root_r))
+        parent = _find_roots(parent)
+
+    return parent
+
+
+def label_basins(data: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Label the basins, the 4-connected components of points lower than 9,
+    with a vectorized union-find over flat indices
+    Args:
+        data: Input data
+    Returns:
+        Basin label of every point, -1 for height 9, and the number of basins
+    """
+    is_open = data != 9
+    index = np.arange(data.size).reshape(data.shape)
+    horiz = is_open[:, :-1] & is_open[:, 1:]
+    vert = is_open[:-1, :] & is_open[1:, :]
+    left = np.concatenate([index[:, :-1][horiz], index[:-1, :][vert]])
+    right = np.concatenate([index[:, 1:][horiz], index[1:, :][vert]])
+
+    parent = _union_edges(data.size, left, right)
+
+    labels = np.full(data.size, -1)
+    _, labels[is_open.ravel()] = np.unique(parent[is_open.ravel()], return_inverse=True)
+    return labels.reshape(data.shape), int(labels.max()) + 1
+
+
+def get_basin_sizes(data: np.ndarray) -> np.ndarray:
     """Get sizes of the basins
     Args:
         data: Input data
     Returns:
         Sizes of each basin
     """
-    visited = np.zeros_like(data)
-    rows_list, cols_list = get_low_points(data)
-    size_list = []
-    for point in zip(rows_list, cols_list):
-        stack = [point]
-        size_ = 0
-        while stack:
-            i, j = stack.pop(0)
-            if not visited[i, j]:
-                visited[i, j] = 1
-                size_ += 1
-            r_list, c_list = get_neighbours(data, i, j)
-            for sub in zip(r_list, c_list):
-                if (data[point] < data[sub] < 9) and not visited[sub]:
-                    stack.append(sub)
-        size_list.append(size_)
-
-    return size_list
+    labels, num = label_basins(data)
+    return np.bincount(labels[labels >= 0], minlength=num)
 
 
 def prod_basin_sizes(data: np.ndarray) -> int:
@@ -162,8 +230,261 @@ def prod_basin_sizes(data: np.ndarray) -> int:
         Product of top 3 basin sizes
     """
     size_list = get_basin_sizes(data)
-    tmp = sorted(size_list, reverse=True)[:3]
-    return np.prod(tmp)
+    top = min(3, len(size_list))
+    return int(np.prod(np.partition(size_list, -top)[-top:]))
+
+
+def _analyse_band(
+    task: Tuple[Path, int, int],
+) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    """Analyse a band of rows of a memory mapped heightmap
+    Args:
+        task: Path of the .npy heightmap, first row and end row of the band
+    Returns:
+        Risk of the low points, sizes of the basins within the band and the
+        basin labels of the first and last row of the band
+    """
+    map_path, start, stop = task
+    data = np.load(map_path, mmap_mode="r")
+
+    # One row of halo on each side to compare the band edges with
+    halo_start = max(start - 1, 0)
+    halo = np.asarray(data[halo_start : min(stop + 1, len(data))])
+    mask = low_point_mask(halo)[start - halo_start : stop - halo_start]
+    band = halo[start - halo_start : stop - halo_start]
+    risk = int((band[mask] + 1).sum())
+
+    labels, num = label_basins(band)
+    sizes = np.bincount(labels[labels >= 0], minlength=num)
+    return risk, sizes, labels[0].copy(), labels[-1].copy()
+
+
+def analyse_heightmap(
+    map_path: Path, band_rows: int = 1024, workers: Optional[int] = None
+) -> Tuple[int, int]:
+    """Sum of risk of the low points and product of the 3 largest basins of a
+    memory mapped heightmap, processed band by band of rows
+    Args:
+        map_path: Path of the .npy heightmap
+        band_rows: Number of rows per band
+        workers: Number of worker processes, 1 to process the bands in process
+    Returns:
+        Sum of the risk scores and product of top 3 basin sizes
+    """
+    rows = np.load(map_path, mmap_mode="r").shape[0]
+    tasks = [(map_path, i, min(i + band_rows, rows)) for i in range(0, rows, band_rows)]
+    if workers == 1:
+        results = list(map(_analyse_band, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_analyse_band, tasks))
+
+    # Give the basins of all bands global ids and join them across band edges
+    offsets = np.cumsum([0] + [len(band[1]) for band in results])
+    left, right = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for i in range(1, len(results)):
+        last_row, first_row = results[i - 1][3], results[i][2]
+        joined = (last_row >= 0) & (first_row >= 0)
+        left.append(last_row[joined] + offsets[i - 1])
+        right.append(first_row[joined] + offsets[i])
+    parent = _union_edges(int(offsets[-1]), np.concatenate(left), np.concatenate(right))
+
+    risk = sum(band_risk for band_risk, _, _, _ in results)
+    weights = np.concatenate([band[1] for band in results])
+    sizes = np.bincount(parent, weights=weights).astype(np.int64)
+    top = min(3, int((sizes > 0).sum()))
+    return risk, int(np.prod(np.partition(sizes, -top)[-top:]))
+
+
+class HeightMap:
+    """Heightmap keeping its low points and basins up to date under cell updates"""
+
+    def __init__(self, data: np.ndarray) -> None:
+        """Initialize the low points and basins of a heightmap
+        Args:
+            data: Input data
+        """
+        self.data = np.array(data)
+        rows, cols = get_low_points(self.data)
+        self.low: Set[Tuple[int, int]] = set(zip(rows.tolist(), cols.tolist()))
+        self.risk = int((self.data[rows, cols] + 1).sum())
+
+        self.labels, num = label_basins(self.data)
+        sizes = np.bincount(self.labels[self.labels >= 0], minlength=num)
+        self.sizes: Dict[int, int] = dict(enumerate(sizes.tolist()))
+        self.next_label = num
+        # Max heap of sizes, entries not matching self.sizes are stale
+        self.heap = [(-size, label) for label, size in self.sizes.items()]
+        heapq.heapify(self.heap)
+
+    def _neighbours(self, i: int, j: int) -> List[Tuple[int, int]]:
+        """Get the 4 neighbours of a point
+        Args:
+            i: X position of point
+            j: Y position of point
+        Returns:
+            Neighbours
+        """
+        return list(zip(*get_neighbours(self.data, i, j)))
+
+    def _is_low(self, i: int, j: int) -> bool:
+        """Check if a point is lower than all of its neighbours
+        Args:
+            i: X position of point
+            j: Y position of point
+        Returns:
+            If the point is a low point
+        """
+        val = self.data[i, j]
+        return all(val < self.data[cell] for cell in self._neighbours(i, j))
+
+    def _set_size(self, label: int, size: int) -> None:
+        """Set the size of a basin, removing it if empty
+        Args:
+            label: Basin label
+            size: New size of the basin
+        """
+        if size:
+            self.sizes[label] = size
+            heapq.heappush(self.heap, (-size, label))
+        else:
+            self.sizes.pop(label, None)
+
+        # Drop the stale entries once they outnumber the live ones
+        if len(self.heap) > 2 * len(self.sizes) + 16:
+            self.heap = [(-size, label) for label, size in self.sizes.items()]
+            heapq.heapify(self.heap)
+
+    def _flood(self, start: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """Get all the points with the same label connected to a point
+        Args:
+            start: Point to start from
+        Returns:
+            Points of the region
+        """
+        label = self.labels[start]
+        region = [start]
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            for cell in self._neighbours(*queue.popleft()):
+                if cell not in seen and self.labels[cell] == label:
+                    seen.add(cell)
+                    region.append(cell)
+                    queue.append(cell)
+
+        return region
+
+    def _relabel(self, region: List[Tuple[int, int]], label: int) -> None:
+        """Assign a label to all the points of a region
+        Args:
+            region: Points of the region
+            label: New label
+        """
+        rows, cols = zip(*region)
+        self.labels[list(rows), list(cols)] = label
+
+    def _open(self, i: int, j: int) -> None:
+        """Join a point that is no longer 9 to the basins around it
+        Args:
+            i: X position of point
+            j: Y position of point
+        """
+        seeds: Dict[int, Tuple[int, int]] = {}
+        for cell in self._neighbours(i, j):
+            if self.labels[cell] >= 0:
+                seeds.setdefault(int(self.labels[cell]), cell)
+        if not seeds:
+            keep = self.next_label
+            self.next_label += 1
+            self.sizes[keep] = 0
+        else:
+            # Merge the smaller basins into the largest one
+            keep = max(seeds, key=lambda label: self.sizes[label])
+            for label, cell in seeds.items():
+                if label != keep:
+                    self._relabel(self._flood(cell), keep)
+                    self.sizes[keep] += self.sizes.pop(label)
+
+        self.labels[i, j] = keep
+        self._set_size(keep, self.sizes[keep] + 1)
+
+    def _close(self, i: int, j: int) -> None:
+        """Remove a point that became 9 from its basin, splitting it if needed
+        Args:
+            i: X position of point
+            j: Y position of point
+        """
+        label = int(self.labels[i, j])
+        self.labels[i, j] = -1
+        pieces: List[List[Tuple[int, int]]] = []
+        seen: Set[Tuple[int, int]] = set()
+        for cell in self._neighbours(i, j):
+            if self.labels[cell] == label and cell not in seen:
+                pieces.append(self._flood(cell))
+                seen.update(pieces[-1])
+        if not pieces:
+            self._set_size(label, 0)
+            return
+
+        # The largest piece keeps the label, the others become new basins
+        pieces.sort(key=len)
+        self._set_size(label, len(pieces[-1]))
+        for piece in pieces[:-1]:
+            self._relabel(piece, self.next_label)
+            self._set_size(self.next_label, len(piece))
+            self.next_label += 1
+
+    def update(self, i: int, j: int, value: int) -> None:
+        """Change the height of a point, updating only its neighbourhood
+        Args:
+            i: X position of point
+            j: Y position of point
+            value: New height
+        """
+        old = int(self.data[i, j])
+        if old == value:
+            return
+
+        cells = [(i, j)] + self._neighbours(i, j)
+        for cell in cells:
+            if cell in self.low:
+                self.low.remove(cell)
+                self.risk -= int(self.data[cell]) + 1
+        self.data[i, j] = value
+        for cell in cells:
+            if self._is_low(*cell):
+                self.low.add(cell)
+                self.risk += int(self.data[cell]) + 1
+
+        if old == 9:
+            self._open(i, j)
+        elif value == 9:
+            self._close(i, j)
+
+    def sum_low_points(self) -> int:
+        """Sum of risk of the low points
+        Returns:
+            Sum of the risk scores
+        """
+        return self.risk
+
+    def prod_basin_sizes(self, top: int = 3) -> int:
+        """Product of the largest basin sizes
+        Args:
+            top: Number of largest basins
+        Returns:
+            Product of the top basin sizes
+        """
+        best: List[Tuple[int, int]] = []
+        while self.heap and len(best) < top:
+            size, label = heapq.heappop(self.heap)
+            if self.sizes.get(label) == -size and (size, label) not in best:
+                best.append((size, label))
+        for entry in best:
+            heapq.heappush(self.heap, entry)
+
+        return int(np.prod([-size for size, _ in best]))
 
 
 def main() -> None:
@@ -171,12 +492,15 @@ def main() -> None:
     args = arg_parser()
     setup_logger(args.log_path)
 
-    data = read_file(args.file_path)
+    if args.file_path.suffix == ".npy":
+        ans, ans2 = analyse_heightmap(args.file_path, args.band_rows, args.workers)
+    else:
+        data = read_file(args.file_path)
+        ans = sum_num_low_points(data)
+        ans2 = prod_basin_sizes(data)
 
-    ans = sum_num_low_points(data)
     assert ans == 570
     print(f"Sum of low points in the basin: {ans}")
-    ans2 = prod_basin_sizes(data)
     assert ans2 == 899392
     print(f"Product of 3 largest basins: {ans2}")
 
@@ -0,0 +1,42 @@
+"""Tests for day 9"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+from main import HeightMap, prod_basin_sizes, read_file, sum_num_low_points
+
+
+def test_heightmap():
+    """Test the incremental heightmap against recomputing after every update"""
+    path = os.path.dirname(os.path.realpath(__file__))
+    data = read_file(Path(path + "/inputs.txt"))
+    heightmap = HeightMap(data)
+    assert heightmap.sum_low_points() == sum_num_low_points(data)
+    assert heightmap.prod_basin_sizes() == prod_basin_sizes(data)
+
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        i, j = rng.integers(data.shape[0]), rng.integers(data.shape[1])
+        # Favour 9s to split and merge basins often
+        value = 9 if rng.random() < 0.5 else int(rng.integers(9))
+        heightmap.update(i, j, value)
+        data[i, j] = value
+        assert heightmap.sum_low_points() == sum_num_low_points(data)
+        assert heightmap.prod_basin_sizes() == prod_basin_sizes(data)
+
+
+def test_heightmap_small():
+    """Test the incremental heightmap on small grids with few basins"""
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        data = rng.integers(10, size=(6, 7))
+        heightmap = HeightMap(data)
+        for _ in range(50):
+            i, j = rng.integers(6), rng.integers(7)
+            value = int(rng.integers(10))
+            heightmap.update(i, j, value)
+            data[i, j] = value
+            assert heightmap.sum_low_points() == sum_num_low_points(data)
+            assert heightmap.prod_basin_sizes() == prod_basin_sizes(data)